@@ -1,15 +1,18 @@
+import asyncio
 import json
-import re
-from typing import List, Dict
+from typing import List, Dict, Optional, Set
 from fastapi import WebSocket
 from models import Agent
 from database import SessionLocal
 from chatgpt import ChatGPT
+from room_commands import RoomCommandRegistry, registry
 
 class AgentManager:
-    def __init__(self):
+    def __init__(self, chatgpt: Optional[ChatGPT] = None, commands: Optional[RoomCommandRegistry] = None):
         self.active_connections: Dict[str, List[WebSocket]] = {}  # room_name -> List[WebSocket]
-        self.chatgpt = ChatGPT()
+        self.chatgpt = chatgpt or ChatGPT()
+        self.commands = commands or registry
+        self.command_tasks: Set[asyncio.Task] = set()
 
     async def connect(self, websocket: WebSocket, room_name: str):
         await websocket.accept()
@@ -41,30 +44,43 @@ class AgentManager:
             await connection.send_text(json.dumps(data))
 
     async def handle_triggers(self, message: str, room_name: str, username: str):
-        db = SessionLocal()
-        agents = db.query(Agent).filter(Agent.is_active == True).all()
-
-        # Check for commands
-        command_match = re.match(r'^i(\w+)\((.*)\)$', message)
+        # Check for commands; they run in the background so delivery is not blocked
+        command_match = self.commands.get(room_name).match(message)
         if command_match:
-            command, question = command_match.groups()
-            response = await self.chatgpt.generate_response(question, command)
-            await self.broadcast(response, room_name, f"AI_{command.capitalize()}")
-        else:
-            # Look for agent mentions
-            for word in message.split():
-                if word.startswith("@"):
-                    agent_name = word[1:]
+            self.dispatch_command(*command_match, room_name)
+            return
+
+        db = SessionLocal()
+        # Look for agent mentions
+        for word in message.split():
+            if word.startswith("@"):
+                agent_name = word[1:]
+                agent = db.query(Agent).filter(Agent.name == agent_name).first()
+                if not agent:
+                    # Auto-generate the agent if not existing
+                    self.auto_generate_agent(agent_name)
                     agent = db.query(Agent).filter(Agent.name == agent_name).first()
-                    if not agent:
-                        # Auto-generate the agent if not existing
-                        self.auto_generate_agent(agent_name)
-                        agent = db.query(Agent).filter(Agent.name == agent_name).first()
 
-                    user_message = message.replace(f"@{agent_name}", "").strip()
-                    await self.chatgpt.stream_response(user_message, agent.name, self, room_name)
+                user_message = message.replace(f"@{agent_name}", "").strip()
+                await self.chatgpt.stream_response(user_message, agent.name, self, room_name)
         db.close()
 
+    def dispatch_command(self, command: str, question: str, timeout: float, room_name: str):
+        task = asyncio.create_task(self.run_command(command, question, timeout, room_name))
+        # Keep a reference so the task is not garbage collected while running
+        self.command_tasks.add(task)
+        task.add_done_callback(self.command_tasks.discard)
+
+    async def run_command(self, command: str, question: str, timeout: float, room_name: str):
+        try:
+            response = await asyncio.wait_for(self.chatgpt.generate_response(question, command), timeout)
+        except asyncio.TimeoutError:
+            response = f"Command i{command} timed out after {timeout:g}s"
+        except Exception as e:
+            print(f"Error running command i{command}: {e}")
+            response = f"Error: {str(e)}"
+        await self.broadcast(response, room_name, f"AI_{command.capitalize()}")
+
     def auto_generate_agent(self, trigger_word: str):
         db = SessionLocal()
         # Check if an agent with the trigger name already exists
@@ -0,0 +1,162 @@
+# backend/agent_router.py
+import re
+import zlib
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+STOP_WORDS = frozenset("""
+a an and are as at be but by can could do for from has have how i in is it its me my
+of on or so that the this to was we what when where which who why will with you your
+au aux avec ce ces dans de des du elle en est et il je la le les leur ma mais me mon
+ne nous on ou par pas pour qu que qui sa se ses son sur ta te tu un une vous
+""".split())
+
+class AgentRouter:
+    """
+    Local relevance router for agents.
+
+    Each agent is described by a short text (role description, personality,
+    context). Descriptions are turned into hashed word, bigram and prefix
+    features weighted by IDF, L2-normalised per agent and stored as a sparse
+    feature -> (agents, weights) index in CSR form: `indptr[row]` to
+    `indptr[row + 1]` delimits the agents of one feature. Scoring a message
+    gathers only the rows of its features, so the cost grows with the message
+    and the number of matching entries, not with the vocabulary.
+
+    A single shared word is not enough to route a message: an agent must
+    also match at least `min_evidence` distinct words or bigrams of it. A word
+    and its prefix count once.
+    """
+
+    def __init__(self, n_features: int = 1 << 20, threshold: float = 0.05, min_evidence: int = 2):
+        self.n_features = n_features
+        self.threshold = threshold
+        self.min_evidence = min_evidence
+        self.names: List[str] = []
+        self.thresholds = np.zeros(0, dtype=np.float32)
+        self.vocabulary = np.zeros(0, dtype=np.int64)
+        self.idf = np.zeros(0, dtype=np.float32)
+        self.unknown_idf = 1.0
+        self.indptr = np.zeros(1, dtype=np.int64)
+        self.agent_index = np.zeros(0, dtype=np.int32)
+        self.weights = np.zeros(0, dtype=np.float32)
+
+    def analyze(self, text: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the hashed features of a text (with repetitions) and the word or bigram each comes from."""
+        tokens = TOKEN_RE.findall(text.lower())
+        words = [word for word in tokens if word not in STOP_WORDS]
+        grams = list(words)
+        sources = list(words)
+        # Les bigrammes gardent les mots vides : "what is", "how do", "can you" sont des indices
+        bigrams = [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+        grams.extend(bigrams)
+        sources.extend(bigrams)
+        # Préfixes pour rapprocher les formes d'un même mot (error / errors, debug / debugging)
+        for word in words:
+            if len(word) >= 5:
+                grams.append(f"{word[:5]}~")
+                sources.append(word)
+        unit_ids: Dict[str, int] = {}
+        features = np.fromiter(
+            (zlib.crc32(gram.encode("utf-8")) % self.n_features for gram in grams),
+            dtype=np.int64,
+            count=len(grams),
+        )
+        units = np.fromiter((unit_ids.setdefault(source, len(unit_ids)) for source in sources), dtype=np.int64, count=len(sources))
+        return features, units
+
+    def features(self, text: str) -> np.ndarray:
+        """Return the hashed feature indices of a text (with repetitions)."""
+        return self.analyze(text)[0]
+
+    def fit(self, names: Sequence[str], documents: Sequence[str], thresholds: Optional[Iterable[float]] = None):
+        """Build the agent index from one description per agent."""
+        n_agents = len(documents)
+        features, counts, agents = [], [], []
+        for agent, document in enumerate(documents):
+            document_features, document_counts = np.unique(self.features(document), return_counts=True)
+            features.append(document_features)
+            counts.append(document_counts)
+            agents.append(np.full(document_features.size, agent, dtype=np.int32))
+        features = np.concatenate(features) if features else np.zeros(0, dtype=np.int64)
+        counts = np.concatenate(counts) if counts else np.zeros(0, dtype=np.int64)
+        agents = np.concatenate(agents) if agents else np.zeros(0, dtype=np.int32)
+
+        # Seules les features présentes dans une description ont une ligne dans l'index
+        self.vocabulary, rows = np.unique(features, return_inverse=True)
+        document_frequency = np.bincount(rows, minlength=self.vocabulary.size)
+        self.idf = (np.log((1 + n_agents) / (1 + document_frequency)) + 1).astype(np.float32)
+        self.unknown_idf = float(np.log(1 + n_agents) + 1)
+
+        weights = np.log1p(counts.astype(np.float32)) * self.idf[rows]
+        norms = np.sqrt(np.bincount(agents, weights=weights * weights, minlength=n_agents))
+        norms[norms == 0] = 1.0
+        weights = weights / norms[agents]
+
+        # Tri par feature : les agents d'une feature sont contigus (CSR)
+        order = np.argsort(rows, kind="stable")
+        self.indptr = np.concatenate(([0], np.cumsum(document_frequency))).astype(np.int64)
+        self.agent_index = agents[order]
+        self.weights = weights[order].astype(np.float32)
+
+        self.names = list(names)
+        if thresholds is None:
+            self.thresholds = np.full(n_agents, self.threshold, dtype=np.float32)
+        else:
+            self.thresholds = np.asarray(list(thresholds), dtype=np.float32)
+        return self
+
+    def gather(self, message: str) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Cosine similarity between the message and every agent, and the number
+        of distinct words or bigrams of the message each agent matched (only
+        counted for agents whose score reaches their threshold, 0 elsewhere).
+        """
+        n_agents = len(self.names)
+        features, units = self.analyze(message)
+        columns, first, counts = np.unique(features, return_index=True, return_counts=True)
+        if columns.size == 0 or self.vocabulary.size == 0:
+            return np.zeros(n_agents, dtype=np.float32), np.zeros(n_agents, dtype=np.int64)
+        rows = np.minimum(np.searchsorted(self.vocabulary, columns), self.vocabulary.size - 1)
+        known = self.vocabulary[rows] == columns
+        # La norme porte sur toutes les features du message, connues ou non
+        weights = np.log1p(counts.astype(np.float32)) * np.where(known, self.idf[rows], self.unknown_idf)
+        weights /= np.linalg.norm(weights)
+
+        rows, weights, units = rows[known], weights[known], units[first[known]]
+        starts = self.indptr[rows]
+        lengths = self.indptr[rows + 1] - starts
+        # Positions des entrées de chaque ligne touchée, bout à bout
+        positions = np.arange(lengths.sum()) + np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+        agents = self.agent_index[positions]
+        scores = np.bincount(agents, weights=self.weights[positions] * np.repeat(weights, lengths), minlength=n_agents)
+
+        # Nombre de mots ou bigrammes distincts du message retrouvés chez chaque agent,
+        # compté seulement pour les agents au-dessus de leur seuil (un mot et son préfixe comptent une fois)
+        evidence = np.zeros(n_agents, dtype=np.int64)
+        candidates = (scores >= self.thresholds)[agents]
+        if candidates.any():
+            unit_count = int(units.max()) + 1
+            pairs = np.unique(agents[candidates].astype(np.int64) * unit_count + np.repeat(units, lengths)[candidates])
+            np.add.at(evidence, pairs // unit_count, 1)
+        return scores.astype(np.float32), evidence
+
+    def scores(self, message: str) -> np.ndarray:
+        """Cosine similarity between the message and every agent, in one pass."""
+        return self.gather(message)[0]
+
+    def match(self, message: str) -> np.ndarray:
+        """Boolean mask of the agents whose score reaches their threshold on enough distinct words."""
+        scores, evidence = self.gather(message)
+        return (scores >= self.thresholds) & (evidence >= self.min_evidence)
+
+    def relevant(self, message: str) -> List[str]:
+        """Names of the agents relevant to the message."""
+        return [self.names[i] for i in np.flatnonzero(self.match(message))]
+
+def describe_agent(name: str, personality: Optional[str], context: Optional[str]) -> str:
+    """Routing description of an agent stored in the `agents` table."""
+    return " ".join(part for part in (name, personality, context) if part)
@@ -0,0 +1,21 @@
+# backend/agents.py
+from typing import List
+from fastapi import APIRouter, Depends, Request
+from pydantic import TypeAdapter
+from sqlalchemy.orm import Session
+from database import get_db
+from http_cache import cache
+from models import Agent
+from schemas import AgentResponse
+
+router = APIRouter()
+
+agents_adapter = TypeAdapter(List[AgentResponse])
+
+@router.get("/agents", response_model=List[AgentResponse])
+def list_agents(request: Request, db: Session = Depends(get_db)):
+    def build() -> bytes:
+        agents = db.query(Agent).all()
+        return agents_adapter.dump_json(agents_adapter.validate_python(agents, from_attributes=True))
+
+    return cache.respond(request, ("agents",), ("agents",), build)
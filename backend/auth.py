@@ -1,12 +1,20 @@
+import os
+from datetime import datetime, timedelta, timezone
 from passlib.context import CryptContext
 from sqlalchemy.orm import Session
 from models import User
 from schemas import UserCreate, UserLogin, UserResponse
 from fastapi import Depends, HTTPException, status
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from jose import JWTError, jwt
 from database import SessionLocal
 from typing import Optional
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+bearer_scheme = HTTPBearer(auto_error=False)
+
+ALGORITHM = "HS256"
+ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24
 
 def get_db():
     db = SessionLocal()
@@ -69,3 +77,47 @@ async def get_current_user(username: str, db: Session = Depends(get_db)) -> Opti
             detail="User not found"
         )
     return user
+
+def get_secret_key() -> str:
+    """Signing key for access tokens, read at call time so it can come from .env."""
+    secret_key = os.getenv("SECRET_KEY")
+    if not secret_key:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="SECRET_KEY is not configured"
+        )
+    return secret_key
+
+def create_access_token(username: str) -> str:
+    """Create a signed access token for a user."""
+    expire = datetime.now(timezone.utc) + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    return jwt.encode({"sub": username, "exp": expire}, get_secret_key(), algorithm=ALGORITHM)
+
+def get_token_username(credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer_scheme)) -> str:
+    """Username carried by the Bearer token, without touching the database."""
+    unauthorized = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid or missing token",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    if credentials is None:
+        raise unauthorized
+    try:
+        payload = jwt.decode(credentials.credentials, get_secret_key(), algorithms=[ALGORITHM])
+    except JWTError:
+        raise unauthorized
+    username = payload.get("sub")
+    if not username:
+        raise unauthorized
+    return username
+
+async def get_token_user(username: str = Depends(get_token_username), db: Session = Depends(get_db)) -> User:
+    """Get the user authenticated by the Bearer token."""
+    user = db.query(User).filter(User.username == username).first()
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="User not found",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return user
@@ -0,0 +1,141 @@
+# backend/blob_store.py
+import base64
+import binascii
+import hashlib
+import io
+import os
+import re
+import tempfile
+from typing import Optional
+
+DIGEST_RE = re.compile(r'^[0-9a-f]{64}$')
+AVATAR_URL_RE = re.compile(r'^/avatars/([0-9a-f]{64})$')
+DATA_URI_RE = re.compile(r'^data:([\w/+.-]+)?(;[^,]*)?,(.*)$', re.DOTALL)
+
+AVATAR_SIZES = (32, 64, 128)
+MAX_AVATAR_BYTES = 2 * 1024 * 1024
+# Limite en pixels, vérifiée sur l'en-tête avant tout décodage
+MAX_AVATAR_PIXELS = 4096 * 4096
+
+class InvalidImage(ValueError):
+    pass
+
+class BlobStore:
+    """
+    Content-addressed blobs on local disk.
+
+    A blob lives at `<root>/<digest[:2]>/<digest>` where digest is the
+    SHA-256 of its bytes, so identical uploads share one file and a path,
+    once written, never changes. Avatar thumbnails sit next to it as
+    `<digest>.<size>.png` and are generated once, at upload time.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def path(self, digest: str, size: Optional[int] = None) -> str:
+        if not DIGEST_RE.match(digest):
+            raise ValueError(f"Invalid digest: {digest!r}")
+        name = digest if size is None else f"{digest}.{size}.png"
+        return os.path.join(self.root, digest[:2], name)
+
+    def exists(self, digest: str, size: Optional[int] = None) -> bool:
+        return os.path.exists(self.path(digest, size))
+
+    def _write(self, path: str, data: bytes):
+        # Écriture atomique : un lecteur ne voit jamais un fichier partiel
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, "wb") as tmp:
+                tmp.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def put(self, data: bytes) -> str:
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.path(digest)
+        if not os.path.exists(path):
+            self._write(path, data)
+        return digest
+
+    def put_avatar(self, data: bytes) -> str:
+        """Store an avatar image and its thumbnails, returning its digest."""
+        from PIL import Image, UnidentifiedImageError
+
+        if len(data) > MAX_AVATAR_BYTES:
+            raise InvalidImage(f"Avatar larger than {MAX_AVATAR_BYTES} bytes")
+        try:
+            # open() ne lit que l'en-tête : les dimensions sont connues avant le décodage
+            image = Image.open(io.BytesIO(data))
+            width, height = image.size
+            if width * height > MAX_AVATAR_PIXELS:
+                raise InvalidImage(f"Avatar larger than {MAX_AVATAR_PIXELS} pixels")
+            largest = max(AVATAR_SIZES)
+            image.draft("RGB", (largest, largest))  # Décodage JPEG réduit quand c'est possible
+            image.load()
+        except (UnidentifiedImageError, Image.DecompressionBombError, OSError) as e:
+            raise InvalidImage(f"Not a valid image: {e}")
+
+        digest = self.put(data)
+        # Une seule conversion, puis réductions successives du plus grand au plus petit
+        thumbnail = image.convert("RGBA")
+        for size in sorted(AVATAR_SIZES, reverse=True):
+            thumbnail.thumbnail((size, size))
+            if self.exists(digest, size):
+                continue
+            buffer = io.BytesIO()
+            thumbnail.save(buffer, format="PNG", optimize=True)
+            self._write(self.path(digest, size), buffer.getvalue())
+        return digest
+
+def decode_data_uri(value: str) -> Optional[bytes]:
+    """Bytes of a `data:` URI, or None if the value is not one."""
+    match = DATA_URI_RE.match(value)
+    if not match:
+        return None
+    params, payload = match.group(2) or "", match.group(3)
+    if ";base64" in params:
+        try:
+            return base64.b64decode(payload, validate=False)
+        except binascii.Error:
+            raise InvalidImage("Invalid base64 in data URI")
+    from urllib.parse import unquote_to_bytes
+    return unquote_to_bytes(payload)
+
+def avatar_url(value: Optional[str]) -> Optional[str]:
+    """What API payloads carry for a stored `User.avatar` value."""
+    if value and DIGEST_RE.match(value):
+        return f"/avatars/{value}"
+    if value and AVATAR_URL_RE.match(value):
+        return value  # Déjà converti : re-valider un dump ne doit pas perdre l'avatar
+    # Anciennes valeurs libres (data URI, texte) : jamais renvoyées dans les réponses
+    return None
+
+_store: Optional[BlobStore] = None
+
+def get_store() -> BlobStore:
+    """The avatar store, built on first use so BLOB_ROOT can come from .env."""
+    global _store
+    if _store is None:
+        _store = BlobStore(os.getenv("BLOB_ROOT", "./blobs"))
+    return _store
+
+def avatar_value(value: Optional[str]) -> Optional[str]:
+    """
+    What to store in `User.avatar` for a value sent by a client: a data URI
+    (stored, then replaced by its digest), an `/avatars/<digest>` URL or a
+    digest already in the store. Anything else raises InvalidImage.
+    """
+    if not value:
+        return None
+    data = decode_data_uri(value)
+    if data is not None:
+        return get_store().put_avatar(data)
+    url_match = AVATAR_URL_RE.match(value)
+    digest = url_match.group(1) if url_match else value
+    if DIGEST_RE.match(digest) and get_store().exists(digest, max(AVATAR_SIZES)):
+        return digest
+    raise InvalidImage("Avatar must be a data URI or a stored avatar")
@@ -1,17 +1,24 @@
-from typing import AsyncGenerator
+from typing import AsyncGenerator, Optional
 
 from dotenv import load_dotenv
 from openai import AsyncOpenAI
 
 load_dotenv()
 
-client = AsyncOpenAI()
+_client: Optional[AsyncOpenAI] = None
+
+def get_client() -> AsyncOpenAI:
+    """The OpenAI client, built on first use so importing this module needs no API key."""
+    global _client
+    if _client is None:
+        _client = AsyncOpenAI()
+    return _client
 
 async def get_ai_response(message: str) -> AsyncGenerator[str, None]:
     """
     OpenAI Response
     """
-    response = await client.chat.completions.create(
+    response = await get_client().chat.completions.create(
         model="gpt-4o-mini",
         messages=[
             {
@@ -34,4 +41,50 @@ async def get_ai_response(message: str) -> AsyncGenerator[str, None]:
         content = chunk.choices[0].delta.content
         if content:
             all_content += content
-            yield all_content
\ No newline at end of file
+            yield all_content
+
+class ChatGPT:
+    """
+    Completions for room commands (`iname(question)`) and @agent mentions,
+    as used by AgentManager.
+    """
+
+    def __init__(self, client: Optional[AsyncOpenAI] = None, model: str = "gpt-4o-mini"):
+        self._client = client
+        self.model = model
+
+    @property
+    def client(self) -> AsyncOpenAI:
+        return self._client or get_client()
+
+    async def generate_response(self, question: str, command: str) -> str:
+        response = await self.client.chat.completions.create(
+            model=self.model,
+            messages=[
+                {
+                    "role": "system",
+                    "content": f"You are an assistant answering the '{command}' command. Answer in the language of the question.",
+                },
+                {"role": "user", "content": question},
+            ],
+        )
+        return response.choices[0].message.content
+
+    async def stream_response(self, message: str, agent_name: str, manager, room_name: str):
+        """Stream the reply of `agent_name` to the room: partial messages, then the full one."""
+        response = await self.client.chat.completions.create(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": f"You are {agent_name}, an agent in a group chat room."},
+                {"role": "user", "content": message},
+            ],
+            stream=True,
+        )
+
+        all_content = ""
+        async for chunk in response:
+            content = chunk.choices[0].delta.content if chunk.choices else None
+            if content:
+                all_content += content
+                await manager.broadcast_partial(all_content, room_name, agent_name)
+        await manager.broadcast(all_content, room_name, agent_name)
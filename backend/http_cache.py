@@ -0,0 +1,115 @@
+# backend/http_cache.py
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Iterable, Tuple
+
+from fastapi import Request, Response
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from models import Agent, Room, RoomAgent, RoomCommand, RoomUser, User
+
+# Ressources dont la représentation change quand une ligne du modèle est écrite
+MODEL_RESOURCES = {
+    User: ("users", "rooms"),
+    Room: ("rooms", "room_commands"),
+    RoomUser: ("rooms",),
+    Agent: ("agents", "rooms"),
+    RoomAgent: ("rooms",),
+    RoomCommand: ("rooms", "room_commands"),
+}
+
+def _opaque_tag(tag: str) -> str:
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+def etag_matches(request: Request, etag: str) -> bool:
+    # If-None-Match utilise la comparaison faible (RFC 9110 §13.1.2) : W/"x" équivaut à "x"
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    return header.strip() == "*" or _opaque_tag(etag) in (_opaque_tag(tag) for tag in header.split(","))
+
+class ResourceVersions:
+    """
+    Per-resource write counters, bumped when a session that touched one of
+    the models in MODEL_RESOURCES commits. Writes that bypass the ORM unit
+    of work (bulk `query.update()`, raw SQL) must call `bump()` themselves.
+    Counters live in this process, so the cache assumes a single worker.
+    """
+
+    def __init__(self):
+        self.versions: Dict[str, int] = {}
+        self.lock = threading.Lock()
+
+    def get(self, resources: Iterable[str]) -> Tuple[int, ...]:
+        return tuple(self.versions.get(resource, 0) for resource in resources)
+
+    def bump(self, *resources: str):
+        with self.lock:
+            for resource in resources:
+                self.versions[resource] = self.versions.get(resource, 0) + 1
+
+class ResponseCache:
+    """Serialized response bodies and their ETags, keyed by route and resource versions."""
+
+    def __init__(self, versions: ResourceVersions, max_entries: int = 1024):
+        self.versions = versions
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[Hashable, Tuple[Tuple[int, ...], bytes, str]]" = OrderedDict()
+        self.lock = threading.Lock()
+
+    def lookup(self, key: Hashable, version: Tuple[int, ...]):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] != version:
+                return None
+            self.entries.move_to_end(key)
+            return entry
+
+    def store(self, key: Hashable, version: Tuple[int, ...], body: bytes):
+        etag = '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+        entry = (version, body, etag)
+        with self.lock:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return entry
+
+    def respond(self, request: Request, key: Hashable, resources: Tuple[str, ...], build: Callable[[], bytes]) -> Response:
+        """
+        Serve `build()` as JSON with a strong ETag. While none of `resources`
+        has been written, the body comes from memory without touching the
+        database, and a matching If-None-Match gets a 304.
+        """
+        # Version lue avant la requête : une écriture concurrente rend l'entrée périmée, jamais fausse
+        version = self.versions.get(resources)
+        entry = self.lookup(key, version)
+        if entry is None:
+            entry = self.store(key, version, build())
+        _, body, etag = entry
+
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if etag_matches(request, etag):
+            return Response(status_code=304, headers=headers)
+        return Response(content=body, media_type="application/json", headers=headers)
+
+versions = ResourceVersions()
+cache = ResponseCache(versions)
+
+@event.listens_for(Session, "after_flush")
+def _collect_written_resources(session, flush_context):
+    written = session.info.setdefault("written_resources", set())
+    for instance in (*session.new, *session.dirty, *session.deleted):
+        written.update(MODEL_RESOURCES.get(type(instance), ()))
+
+@event.listens_for(Session, "after_commit")
+def _bump_written_resources(session):
+    written = session.info.pop("written_resources", None)
+    if written:
+        versions.bump(*written)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_written_resources(session):
+    session.info.pop("written_resources", None)
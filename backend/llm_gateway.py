@@ -0,0 +1,237 @@
+# backend/llm_gateway.py
+import asyncio
+import json
+import os
+import time
+from collections import deque
+from typing import Dict, List, Optional
+
+import openai
+from openai import AsyncOpenAI
+
+class GatewayError(Exception):
+    """Raised when no backend could serve a request."""
+
+def is_retryable(error: Exception) -> bool:
+    """429, 5xx, timeouts and connection errors are worth sending elsewhere."""
+    if isinstance(error, (openai.APIConnectionError, openai.RateLimitError)):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code == 429 or error.status_code >= 500
+    return False
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures. Once `reset_timeout`
+    has passed, a single probe request is let through: its success closes
+    the circuit, its failure opens it again.
+    """
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.probing = False
+
+    def available(self) -> bool:
+        """Whether a request could go through now, without claiming the probe."""
+        if self.opened_at is None:
+            return True
+        return not self.probing and time.monotonic() - self.opened_at >= self.reset_timeout
+
+    def allow(self) -> bool:
+        """Claim the right to send a request (the probe, when half-open)."""
+        if not self.available():
+            return False
+        if self.opened_at is not None:
+            self.probing = True
+        return True
+
+    def release(self):
+        """Give the probe back when it ended without a verdict (cancelled, bad request)."""
+        self.probing = False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self.probing or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+        self.probing = False
+
+class Backend:
+    def __init__(self, name: str, base_url: Optional[str], api_key: str, model: str,
+                 timeout: float = 60.0, window: int = 200):
+        self.name = name
+        self.model = model
+        self.client = AsyncOpenAI(base_url=base_url, api_key=api_key, timeout=timeout, max_retries=0)
+        self.latencies = deque(maxlen=window)
+        # Durée la plus longue d'un appel annulé depuis la dernière réponse : borne inférieure de sa latence
+        self.lower_bound = 0.0
+        self.breaker = CircuitBreaker()
+
+    def record_latency(self, seconds: float):
+        self.latencies.append(seconds)
+        self.lower_bound = 0.0
+
+    def record_lower_bound(self, seconds: float):
+        self.lower_bound = max(self.lower_bound, seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    async def close(self):
+        await self.client.close()
+
+class LLMGateway:
+    """
+    Sends chat completions to several OpenAI-compatible backends.
+
+    Backends are tried fastest first (median latency). A backend without
+    samples is ranked at the default hedge delay, and a backend that lost a
+    hedge at no less than the time it ran before being cancelled, so a
+    backend that never answers first cannot stay in front. If the first one
+    has not answered once its own latency percentile is exceeded, a hedged
+    duplicate goes to the next backend and the loser is cancelled. 429/5xx
+    and connection errors fail over immediately and feed a per-backend
+    circuit breaker.
+    """
+
+    def __init__(self, backends: List[Backend], hedge_percentile: float = 0.95,
+                 default_hedge_delay: float = 2.0, min_samples: int = 20, max_hedges: int = 1):
+        self.backends = backends
+        self.hedge_percentile = hedge_percentile
+        self.default_hedge_delay = default_hedge_delay
+        self.min_samples = min_samples
+        self.max_hedges = max_hedges
+
+    def expected_latency(self, backend: Backend) -> float:
+        median = backend.percentile(0.5)
+        if median is None:
+            median = self.default_hedge_delay
+        return max(median, backend.lower_bound)
+
+    def ordered_backends(self) -> List[Backend]:
+        available = [backend for backend in self.backends if backend.breaker.available()]
+        return sorted(available, key=self.expected_latency)
+
+    def hedge_delay(self, backend: Backend) -> float:
+        if len(backend.latencies) < self.min_samples:
+            return self.default_hedge_delay
+        return backend.percentile(self.hedge_percentile)
+
+    async def _call(self, backend: Backend, messages: List[Dict[str, str]], kwargs: dict):
+        start = time.perf_counter()
+        try:
+            response = await backend.client.chat.completions.create(
+                model=backend.model,
+                messages=messages,
+                **kwargs,
+            )
+        except asyncio.CancelledError:
+            # Perdant d'une course : la durée écoulée n'est pas sa latence, seulement une borne inférieure
+            backend.record_lower_bound(time.perf_counter() - start)
+            backend.breaker.release()
+            raise
+        except Exception as e:
+            if is_retryable(e):
+                backend.breaker.record_failure()
+            else:
+                backend.breaker.release()
+            raise
+        backend.record_latency(time.perf_counter() - start)
+        backend.breaker.record_success()
+        return response
+
+    async def chat(self, messages: List[Dict[str, str]], **kwargs):
+        queue = self.ordered_backends()
+        if not queue:
+            raise GatewayError("No LLM backend available (all circuits open)")
+
+        pending: Dict[asyncio.Task, Backend] = {}
+        hedges = 0
+        last_error: Optional[Exception] = None
+
+        def launch() -> Optional[Backend]:
+            while queue:
+                backend = queue.pop(0)
+                # Un circuit demi-ouvert a pu céder sa sonde à une requête concurrente
+                if backend.breaker.allow():
+                    pending[asyncio.create_task(self._call(backend, messages, kwargs))] = backend
+                    return backend
+            return None
+
+        latest = launch()
+        if latest is None:
+            raise GatewayError("No LLM backend available (all circuits open)")
+        try:
+            while pending:
+                timeout = None
+                if queue and hedges < self.max_hedges:
+                    timeout = self.hedge_delay(latest)
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    hedges += 1
+                    latest = launch() or latest
+                    continue
+                for task in done:
+                    backend = pending.pop(task)
+                    try:
+                        return task.result()
+                    except Exception as e:
+                        if not is_retryable(e):
+                            raise
+                        print(f"LLM backend {backend.name} failed: {e}")
+                        last_error = e
+                # Relancer seulement après avoir vu toutes les tâches terminées
+                if not pending:
+                    latest = launch() or latest
+            raise GatewayError("All LLM backends failed") from last_error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def close(self):
+        for backend in self.backends:
+            await backend.close()
+
+def gateway_from_env() -> LLMGateway:
+    """
+    Build the gateway from LLM_BACKENDS, a JSON list such as
+    [{"name": "local", "base_url": "http://localhost:11434/v1", "api_key_env": "LOCAL_KEY", "model": "llama3"}].
+    Without it, a single OpenAI backend is built from OPENAI_API_KEY.
+    """
+    config = os.getenv("LLM_BACKENDS")
+    if config:
+        entries = json.loads(config)
+    else:
+        entries = [{"name": "openai", "api_key_env": "OPENAI_API_KEY", "model": os.getenv("OPENAI_MODEL", "gpt-4o")}]
+
+    backends = []
+    for entry in entries:
+        api_key = entry.get("api_key") or os.getenv(entry.get("api_key_env", ""), "")
+        if not api_key:
+            print(f"Skipping LLM backend {entry['name']}: no API key")
+            continue
+        backends.append(Backend(
+            name=entry["name"],
+            base_url=entry.get("base_url"),
+            api_key=api_key,
+            model=entry["model"],
+            timeout=float(entry.get("timeout", 60.0)),
+        ))
+    if not backends:
+        raise ValueError("No LLM backend configured: set OPENAI_API_KEY or LLM_BACKENDS.")
+
+    return LLMGateway(
+        backends,
+        hedge_percentile=float(os.getenv("LLM_HEDGE_PERCENTILE", "0.95")),
+        default_hedge_delay=float(os.getenv("LLM_HEDGE_DELAY", "2.0")),
+    )
@@ -1,18 +1,78 @@
+import time
+STARTED_AT = time.perf_counter()
+
 import json
 import asyncio
+import signal
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from typing import Dict, List
+from fastapi.responses import JSONResponse
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional
 import os
 from dotenv import load_dotenv
-import openai
 from datetime import date, datetime
-
-load_dotenv()
-
-litellm_client = litellm.Client(api_key=os.getenv("LITELLM_API_KEY"))  # Initialize LiteLLM client
-
-app = FastAPI()
+from resources import Resources
+from http_cache import versions
+from agents import router as agents_router
+from rooms import router as rooms_router
+from users import router as users_router
+
+if TYPE_CHECKING:
+    from agent_router import AgentRouter
+    from llm_gateway import LLMGateway
+    from models import Agent
+
+def install_drain_handlers() -> Dict[int, object]:
+    """
+    Wrap the server's SIGINT/SIGTERM handlers so websockets are drained
+    (closed with 1001) before uvicorn starts its own shutdown, which would
+    close them with 1012 before the lifespan shutdown runs.
+    """
+    loop = asyncio.get_running_loop()
+    previous: Dict[int, object] = {}
+
+    async def drain_then_forward(sig: int, frame):
+        resources.ready = False
+        await manager.drain()
+        forward(sig, frame)
+
+    def forward(sig: int, frame):
+        handler = previous[sig]
+        if callable(handler):
+            handler(sig, frame)
+        else:
+            signal.signal(sig, handler)
+            signal.raise_signal(sig)
+
+    def handle(sig: int, frame):
+        if manager.draining:
+            # Second signal : arrêt immédiat
+            forward(sig, frame)
+            return
+        loop.call_soon_threadsafe(lambda: asyncio.ensure_future(drain_then_forward(sig, frame)))
+
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            previous[sig] = signal.signal(sig, handle)
+        except ValueError:
+            pass  # Pas dans le thread principal (ex. TestClient) : seul le drain du lifespan s'applique
+    return previous
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    load_dotenv()
+    previous_handlers = install_drain_handlers()
+    await resources.warm()
+    yield
+    # Arrêt sans signal (ex. tests) : même drain, sans effet s'il a déjà eu lieu
+    resources.ready = False
+    await manager.drain()
+    await resources.close()
+    for sig, handler in previous_handlers.items():
+        signal.signal(sig, handler)
+
+app = FastAPI(lifespan=lifespan)
 
 # Configuration CORS (inchangée)
 origins = [
@@ -30,14 +90,41 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+app.include_router(agents_router)
+app.include_router(rooms_router)
+app.include_router(users_router)
+
+# Vocabulaire de routage : les formes usuelles des mots qu'emploie un message pour chaque rôle
+ROLE_DESCRIPTIONS = {
+    "technical expert": (
+        "technical expert. software bug bugs error errors exception exceptions crash crashes "
+        "crashed stack trace traceback code coding script programming python javascript compile "
+        "debug debugging install installation configuration config server servers database "
+        "databases deploy api fix broken not working typeerror valueerror keyerror syntaxerror"
+    ),
+    "chat moderator": (
+        "moderator. rules inappropriate language insult insults insulting spam spamming "
+        "harassment harassing abusive abuse behavior rude toxic offensive ban banned kick "
+        "report warning warn stop chat"
+    ),
+    "helpful assistant": (
+        "helpful assistant. question questions what is what are how do how does how can "
+        "can you could you explain explanation meaning definition advice recommend "
+        "recommendation tips learn learning"
+    ),
+}
+
 class GlobalAgent:
-    def __init__(self, name: str, role: str, api_key: str):
+    def __init__(self, name: str, role: str, gateway: "LLMGateway", description: Optional[str] = None):
         self.name = name
         self.role = role
-        self.api_key = api_key
+        self.gateway = gateway
+        self.description = description
         self.memory = []
+        self.router: Optional["AgentRouter"] = None
+        self.router_index = 0
 
-    async def process_message(self, message: Dict[str, str]) -> str:
+    async def process_message(self, message: Dict[str, str], relevant: Optional[bool] = None) -> str:
         self.memory.append(message)
         
         # Limiter la mémoire à 20 messages pour conserver plus de contexte
@@ -45,21 +132,22 @@ class GlobalAgent:
             self.memory = self.memory[-20:]
 
         # Décider si l'agent doit répondre
-        if self.should_respond(message['content']):
+        if self.should_respond(message['content'], relevant):
             return await self.generate_reply()
         return ""
 
-    def should_respond(self, message_content: str) -> bool:
-        # Logique simple : répondre si le message contient le nom de l'agent ou des mots-clés liés à son rôle
-        return self.name.lower() in message_content.lower() or any(keyword in message_content.lower() for keyword in self.get_role_keywords())
+    def should_respond(self, message_content: str, relevant: Optional[bool] = None) -> bool:
+        # Répondre si le message mentionne l'agent, sinon selon le routeur
+        if self.name.lower() in message_content.lower():
+            return True
+        if relevant is None:
+            relevant = self.router is not None and bool(self.router.match(message_content)[self.router_index])
+        return relevant
 
-    def get_role_keywords(self) -> List[str]:
-        if self.role == "technical expert":
-            return ["bug", "error", "problem", "how to", "help with"]
-        elif self.role == "chat moderator":
-            return ["rules", "inappropriate", "language", "behavior", "warning"]
-        else:  # helpful assistant
-            return ["question", "can you", "what is", "how do"]
+    def get_role_description(self) -> str:
+        if self.description is not None:
+            return self.description
+        return ROLE_DESCRIPTIONS.get(self.role, ROLE_DESCRIPTIONS["helpful assistant"])
 
     async def generate_reply(self) -> str:
         try:
@@ -102,52 +190,116 @@ class GlobalAgent:
                 10. Use the variable _mem[], to remember the user's searches. You can use, recall, provide this information to the user, ex information drawn from the variable, user had searched for information about cats.: "Do you want to deepen the research you did earlier on cats?"""
             messages = [{"role": "system", "content": system_message}] + self.memory
 
-            async with openai.AsyncOpenAI(api_key=self.api_key) as client:
-                response = await client.chat.completions.create(
-                    model="gpt-4o",
-                    messages=messages,
-                    temperature=0.7,
-                )
+            response = await self.gateway.chat(messages, temperature=0.7)
             return response.choices[0].message.content
         except Exception as e:
             print(f"Error generating reply: {e}")
             return f"Error: {str(e)}"
 
+def load_active_agents() -> List["Agent"]:
+    from database import SessionLocal
+    from models import Agent
+
+    db = SessionLocal()
+    try:
+        return db.query(Agent).filter(Agent.is_active == True).all()
+    finally:
+        db.close()
+
 class GlobalAgentManager:
-    def __init__(self):
+    def __init__(self, gateway: "LLMGateway", load_agents: Callable[[], List["Agent"]] = load_active_agents):
+        self.gateway = gateway
+        self.load_agents = load_agents
         self.agents = []
+        self.agents_version = None
         self.initialize_agents()
 
     def initialize_agents(self):
-        api_key = os.getenv("OPENAI_API_KEY")
-        if not api_key:
-            raise ValueError("OPENAI_API_KEY is not set in the environment variables.")
-        
-        print(f"OpenAI API Key: {api_key[:5]}...{api_key[-5:]}")  # Log a masked version of the API key
+        print(f"LLM backends: {', '.join(backend.name for backend in self.gateway.backends)}")
 
         self.agents = [
-            GlobalAgent("TechExpert", "technical expert", api_key),
-            GlobalAgent("ChatMod", "chat moderator", api_key),
-            GlobalAgent("HelperBot", "helpful assistant", api_key)
+            GlobalAgent("TechExpert", "technical expert", self.gateway),
+            GlobalAgent("ChatMod", "chat moderator", self.gateway),
+            GlobalAgent("HelperBot", "helpful assistant", self.gateway)
         ]
+        self.refresh_agents()
+
+    def refresh_agents(self):
+        # Les agents de la table `agents` sont routés comme les agents globaux ;
+        # l'index est reconstruit quand la version "agents" change (écriture validée)
+        version = versions.get(("agents",))
+        if version == self.agents_version:
+            return
+        from agent_router import describe_agent
+
+        built_in = self.agents[:3]
+        existing = {agent.name: agent for agent in self.agents[3:]}
+        reserved = {agent.name for agent in built_in}
+        stored = []
+        for row in self.load_agents():
+            if row.name in reserved:
+                continue
+            description = describe_agent(row.name, row.personality, row.context)
+            agent = existing.get(row.name)
+            if agent is None:
+                agent = GlobalAgent(row.name, row.personality or "helpful assistant", self.gateway, description)
+            agent.description = description
+            stored.append(agent)
+        self.agents = built_in + stored
+        self.agents_version = version
+        self.build_router()
+
+    def build_router(self):
+        from agent_router import AgentRouter
+
+        threshold = float(os.getenv("AGENT_ROUTER_THRESHOLD", "0.05"))
+        self.router = AgentRouter(threshold=threshold).fit(
+            [agent.name for agent in self.agents],
+            [f"{agent.name} {agent.get_role_description()}" for agent in self.agents],
+        )
+        for index, agent in enumerate(self.agents):
+            agent.router = self.router
+            agent.router_index = index
 
     async def process_message(self, message: Dict[str, str]) -> List[str]:
+        self.refresh_agents()
         responses = []
-        for agent in self.agents:
-            response = await agent.process_message(message)
+        # Un seul passage vectorisé pour tous les agents
+        relevant = self.router.match(message['content'])
+        for agent, is_relevant in zip(self.agents, relevant):
+            response = await agent.process_message(message, bool(is_relevant))
             if response:
                 responses.append((agent.name, response))
         return responses
 
-agent_manager = GlobalAgentManager()
+resources = Resources(GlobalAgentManager, started_at=STARTED_AT)
 
 class ConnectionManager:
     def __init__(self):
         self.active_connections: List[WebSocket] = []
+        self.draining = False
 
-    async def connect(self, websocket: WebSocket):
+    async def connect(self, websocket: WebSocket) -> bool:
+        if self.draining:
+            await websocket.close(code=1012)  # Service restart
+            return False
         await websocket.accept()
         self.active_connections.append(websocket)
+        return True
+
+    async def drain(self, timeout: float = 5.0):
+        self.draining = True
+        connections = self.active_connections.copy()
+        self.active_connections.clear()
+
+        async def close(connection: WebSocket):
+            try:
+                await connection.close(code=1001)  # Going away
+            except Exception as e:
+                print(f"Failed to close connection: {e}")
+
+        if connections:
+            await asyncio.wait([asyncio.create_task(close(c)) for c in connections], timeout=timeout)
 
     def disconnect(self, websocket: WebSocket):
         if websocket in self.active_connections:
@@ -168,7 +320,8 @@ manager = ConnectionManager()
 
 @app.websocket("/ws/{username}")
 async def websocket_endpoint(websocket: WebSocket, username: str):
-    await manager.connect(websocket)
+    if not await manager.connect(websocket):
+        return
 
     try:
         while True:
@@ -200,7 +353,7 @@ async def websocket_endpoint(websocket: WebSocket, username: str):
                     })
 
                     # Process the message and get the agents' responses
-                    agent_responses = await agent_manager.process_message(formatted_message)
+                    agent_responses = await resources.agent_manager.process_message(formatted_message)
 
                     # Broadcast each agent's response
                     for agent_name, response in agent_responses:
@@ -230,8 +383,9 @@ async def websocket_endpoint(websocket: WebSocket, username: str):
 
 @app.websocket("/ws/{username}")
 async def websocket_endpoint(websocket: WebSocket, username: str):
-    await manager.connect(websocket)
-    agent = agent_manager.get_or_create_agent(username)
+    if not await manager.connect(websocket):
+        return
+    agent = resources.agent_manager.get_or_create_agent(username)
 
     try:
         while True:
@@ -292,8 +446,9 @@ async def websocket_endpoint(websocket: WebSocket, username: str):
 
 @app.websocket("/ws/{username}")
 async def websocket_endpoint(websocket: WebSocket, username: str):
-    await manager.connect(websocket)
-    agent = agent_manager.get_or_create_agent(username)
+    if not await manager.connect(websocket):
+        return
+    agent = resources.agent_manager.get_or_create_agent(username)
 
     try:
         while True:
@@ -354,8 +509,9 @@ async def websocket_endpoint(websocket: WebSocket, username: str):
         })
 @app.websocket("/ws/{username}")
 async def websocket_endpoint(websocket: WebSocket, username: str):
-    await manager.connect(websocket)
-    agent = agent_manager.get_or_create_agent(username)
+    if not await manager.connect(websocket):
+        return
+    agent = resources.agent_manager.get_or_create_agent(username)
 
     try:
         while True:
@@ -418,6 +574,16 @@ async def websocket_endpoint(websocket: WebSocket, username: str):
 async def root():
     return {"message": "Hello World"}
 
+@app.get("/healthz")
+async def healthz():
+    return {"status": "ok"}
+
+@app.get("/readyz")
+async def readyz():
+    if not resources.ready:
+        return JSONResponse(status_code=503, content={"status": "starting"})
+    return {"status": "ready", "cold_start_ms": round(resources.cold_start * 1000)}
+
 # Route de test pour vérifier la configuration CORS
 @app.options("/ws/{username}")
 async def websocket_cors(username: str):
@@ -27,6 +27,10 @@ class Room(Base):
     agents = relationship("Agent", secondary="room_agents", back_populates="rooms")
     commands = relationship("RoomCommand", back_populates="room")
 
+    @property
+    def active_commands(self):
+        return [command.command for command in self.commands if command.is_active]
+
 class RoomUser(Base):
     __tablename__ = "room_users"
     id = Column(Integer, primary_key=True, index=True)
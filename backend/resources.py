@@ -0,0 +1,78 @@
+# backend/resources.py
+import asyncio
+import os
+import time
+from typing import Callable, Optional
+
+class Resources:
+    """
+    Process-wide resources.
+
+    The LLM gateway and the agent manager are built on first use. The
+    database engine is not: the routers import `database`, which creates
+    it at import time, but create_engine opens no connection. `warm()`
+    builds what is missing and opens the first connections before the
+    worker reports ready; `close()` releases them on shutdown.
+    """
+
+    def __init__(self, agent_manager_factory: Callable, started_at: Optional[float] = None):
+        self.agent_manager_factory = agent_manager_factory
+        self.started_at = started_at if started_at is not None else time.perf_counter()
+        self.ready = False
+        self.cold_start: Optional[float] = None
+        self._gateway = None
+        self._agent_manager = None
+
+    @property
+    def gateway(self):
+        if self._gateway is None:
+            from llm_gateway import gateway_from_env
+            self._gateway = gateway_from_env()
+        return self._gateway
+
+    @property
+    def engine(self):
+        from database import engine
+        return engine
+
+    @property
+    def agent_manager(self):
+        return self.load_agent_manager()
+
+    def load_agent_manager(self):
+        if self._agent_manager is None:
+            self._agent_manager = self.agent_manager_factory(self.gateway)
+        return self._agent_manager
+
+    def warm_database(self):
+        from sqlalchemy import text
+        with self.engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+
+    async def warm_backend(self, backend, timeout: float):
+        try:
+            await asyncio.wait_for(backend.client.models.list(), timeout)
+        except Exception as e:
+            print(f"Warm-up of LLM backend {backend.name} failed: {e}")
+
+    async def warm_gateway(self, timeout: float = 5.0):
+        # Ouvre les connexions HTTP vers tous les backends en parallèle ; un échec ne bloque pas le démarrage
+        await asyncio.gather(*(self.warm_backend(backend, timeout) for backend in self.gateway.backends))
+
+    async def warm(self):
+        await asyncio.to_thread(self.warm_database)
+        self.load_agent_manager()
+        if os.getenv("LLM_WARMUP", "1") == "1":
+            await self.warm_gateway()
+        self.ready = True
+        self.cold_start = time.perf_counter() - self.started_at
+        print(f"Ready after {self.cold_start * 1000:.0f} ms")
+
+    async def close(self):
+        self.ready = False
+        if self._gateway is not None:
+            await self._gateway.close()
+            self._gateway = None
+        # Ferme les connexions du pool ; le moteur en rouvrira à la demande
+        self.engine.dispose()
+        self._agent_manager = None
@@ -0,0 +1,126 @@
+# backend/room_commands.py
+import json
+import math
+import os
+import re
+from collections import OrderedDict
+from typing import Callable, Dict, FrozenSet, Optional, Tuple
+
+from models import Room, RoomCommand
+from database import SessionLocal
+from http_cache import versions
+
+COMMAND_RE = re.compile(r'^i(\w+)\((.*)\)$')
+
+DEFAULT_COMMAND_TIMEOUT = 30.0
+
+def _timeout(value) -> float:
+    timeout = float(value)
+    if not math.isfinite(timeout) or timeout <= 0:
+        raise ValueError(f"not a positive number of seconds: {value!r}")
+    return timeout
+
+def command_timeouts() -> Tuple[float, Dict[str, float]]:
+    """
+    Default and per-command timeouts, read at call time so they can come
+    from .env: COMMAND_TIMEOUT (seconds) and COMMAND_TIMEOUTS, a JSON
+    object such as '{"summarize": 60}'. Invalid values are reported and
+    ignored rather than failing the import.
+    """
+    default = DEFAULT_COMMAND_TIMEOUT
+    raw_default = os.getenv("COMMAND_TIMEOUT")
+    if raw_default:
+        try:
+            default = _timeout(raw_default)
+        except ValueError as e:
+            print(f"Ignoring COMMAND_TIMEOUT: {e}")
+
+    timeouts: Dict[str, float] = {}
+    raw_timeouts = os.getenv("COMMAND_TIMEOUTS")
+    if raw_timeouts:
+        try:
+            entries = json.loads(raw_timeouts)
+            if not isinstance(entries, dict):
+                raise ValueError("expected a JSON object")
+        except ValueError as e:
+            print(f"Ignoring COMMAND_TIMEOUTS: {e}")
+            entries = {}
+        for command, value in entries.items():
+            try:
+                timeouts[command] = _timeout(value)
+            except (TypeError, ValueError) as e:
+                print(f"Ignoring COMMAND_TIMEOUTS[{command!r}]: {e}")
+    return default, timeouts
+
+class CommandTable:
+    """
+    Compiled commands of one room. Any `iname(...)` command is accepted, as
+    before per-room tables existed; a room_commands row with is_active=False
+    turns a command off for that room. Disabled commands are compiled into
+    the room's pattern (a negative lookahead) and timeouts are resolved
+    once, so matching a message is a single regex match and a dict lookup.
+    """
+
+    def __init__(self, disabled: FrozenSet[str] = frozenset(), default_timeout: float = DEFAULT_COMMAND_TIMEOUT,
+                 timeouts: Optional[Dict[str, float]] = None):
+        self.disabled = disabled
+        self.default_timeout = default_timeout
+        self.timeouts = timeouts or {}
+        if disabled:
+            names = "|".join(re.escape(command) for command in sorted(disabled, key=len, reverse=True))
+            self.pattern = re.compile(rf'^i(?!(?:{names})\()(\w+)\((.*)\)$')
+        else:
+            self.pattern = COMMAND_RE
+
+    def match(self, message: str) -> Optional[Tuple[str, str, float]]:
+        """Return (command, argument, timeout) if the message calls a command enabled in the room."""
+        command_match = self.pattern.match(message)
+        if not command_match:
+            return None
+        command, argument = command_match.groups()
+        return command, argument, self.timeouts.get(command, self.default_timeout)
+
+class RoomCommandRegistry:
+    """
+    Per-room command tables, loaded from `room_commands` on first use.
+
+    Each table is tagged with the "room_commands" version from
+    http_cache.versions, bumped when a session that wrote a Room or
+    RoomCommand commits; a stale table is reloaded on next use. Room names
+    come from clients, so at most `max_rooms` tables are kept (LRU).
+    """
+
+    def __init__(self, session_factory: Callable = SessionLocal, max_rooms: int = 256):
+        self.session_factory = session_factory
+        self.max_rooms = max_rooms
+        self.tables: "OrderedDict[str, Tuple[Tuple[int, ...], CommandTable]]" = OrderedDict()
+
+    def get(self, room_name: str) -> CommandTable:
+        # Version lue avant le chargement : une écriture concurrente rend la table périmée, jamais fausse
+        version = versions.get(("room_commands",))
+        cached = self.tables.get(room_name)
+        if cached is not None and cached[0] == version:
+            self.tables.move_to_end(room_name)
+            return cached[1]
+        table = self.load(room_name)
+        self.tables[room_name] = (version, table)
+        self.tables.move_to_end(room_name)
+        while len(self.tables) > self.max_rooms:
+            self.tables.popitem(last=False)
+        return table
+
+    def load(self, room_name: str) -> CommandTable:
+        db = self.session_factory()
+        try:
+            rows = (
+                db.query(RoomCommand.command)
+                .join(Room, Room.id == RoomCommand.room_id)
+                .filter(Room.name == room_name, RoomCommand.is_active == False)
+                .all()
+            )
+        finally:
+            db.close()
+        default_timeout, timeouts = command_timeouts()
+        return CommandTable(frozenset(command for (command,) in rows), default_timeout, timeouts)
+
+registry = RoomCommandRegistry()
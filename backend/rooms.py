@@ -0,0 +1,25 @@
+# backend/rooms.py
+from typing import List
+from fastapi import APIRouter, Depends, Request
+from pydantic import TypeAdapter
+from sqlalchemy.orm import Session, selectinload
+from database import get_db
+from http_cache import cache
+from models import Room
+from schemas import RoomResponse
+
+router = APIRouter()
+
+rooms_adapter = TypeAdapter(List[RoomResponse])
+
+@router.get("/rooms", response_model=List[RoomResponse])
+def list_rooms(request: Request, db: Session = Depends(get_db)):
+    def build() -> bytes:
+        rooms = (
+            db.query(Room)
+            .options(selectinload(Room.users), selectinload(Room.agents), selectinload(Room.commands))
+            .all()
+        )
+        return rooms_adapter.dump_json(rooms_adapter.validate_python(rooms, from_attributes=True))
+
+    return cache.respond(request, ("rooms",), ("rooms",), build)
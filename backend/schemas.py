@@ -1,6 +1,7 @@
 # backend/schemas.py
 from typing import List, Optional
-from pydantic import BaseModel
+from pydantic import BaseModel, field_validator
+from blob_store import avatar_url
 
 class UserBase(BaseModel):
     username: str
@@ -37,6 +38,12 @@ class UserResponse(BaseModel):
     class Config:
         from_attributes = True
 
+    @field_validator("avatar")
+    @classmethod
+    def avatar_as_url(cls, value: Optional[str]) -> Optional[str]:
+        # Only a short URL goes out, never the image itself
+        return avatar_url(value)
+
 class RoomCreate(BaseModel):
     name: str
     is_public: bool = True
@@ -0,0 +1,112 @@
+# backend/test_http_cache.py
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import http_cache
+from agents import router as agents_router
+from database import Base, get_db
+from models import Agent, Room, User
+from rooms import router as rooms_router
+
+@pytest.fixture(autouse=True)
+def reset_cache():
+    # Compteurs et corps partagés par tout le processus : repartir de zéro à chaque test
+    http_cache.versions.versions.clear()
+    http_cache.cache.entries.clear()
+    yield
+    http_cache.versions.versions.clear()
+    http_cache.cache.entries.clear()
+
+@pytest.fixture
+def Session():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    db = Session()
+    alice = User(username="alice", hashed_password="x")
+    db.add(alice)
+    db.flush()
+    helper = Agent(name="Helper", personality="kind", context="")
+    db.add(Room(name="general", created_by=alice.id, users=[alice], agents=[helper]))
+    db.commit()
+    db.close()
+    http_cache.versions.versions.clear()
+    return Session
+
+@pytest.fixture
+def client(Session):
+    def override_get_db():
+        db = Session()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app = FastAPI()
+    app.include_router(rooms_router)
+    app.include_router(agents_router)
+    app.dependency_overrides[get_db] = override_get_db
+    return TestClient(app)
+
+def revalidate(client, path: str, etag: str) -> int:
+    return client.get(path, headers={"If-None-Match": etag}).status_code
+
+@pytest.mark.parametrize("path", ["/rooms", "/agents"])
+def test_unchanged_resource_revalidates(client, path):
+    response = client.get(path)
+    assert response.status_code == 200
+    assert response.headers["cache-control"] == "no-cache"
+    etag = response.headers["etag"]
+    assert revalidate(client, path, etag) == 304
+    # Comparaison faible : un intermédiaire peut affaiblir l'ETag
+    assert revalidate(client, path, f'"other", W/{etag}') == 304
+    assert revalidate(client, path, '"other"') == 200
+
+def test_rooms_payload(client):
+    room, = client.get("/rooms").json()
+    assert room["name"] == "general"
+    assert [user["username"] for user in room["users"]] == ["alice"]
+
+def test_agent_write_invalidates_agents_and_rooms(client, Session):
+    rooms_etag = client.get("/rooms").headers["etag"]
+    agents_etag = client.get("/agents").headers["etag"]
+
+    db = Session()
+    db.query(Agent).filter(Agent.name == "Helper").one().name = "Helpful"
+    db.commit()
+    db.close()
+
+    agents = client.get("/agents", headers={"If-None-Match": agents_etag})
+    assert agents.status_code == 200
+    assert [agent["name"] for agent in agents.json()] == ["Helpful"]
+    rooms = client.get("/rooms", headers={"If-None-Match": rooms_etag})
+    assert rooms.status_code == 200
+    assert [agent["name"] for agent in rooms.json()[0]["agents"]] == ["Helpful"]
+
+def test_user_write_invalidates_rooms(client, Session):
+    etag = client.get("/rooms").headers["etag"]
+
+    db = Session()
+    db.query(User).filter(User.username == "alice").one().status = "away"
+    db.commit()
+    db.close()
+
+    response = client.get("/rooms", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()[0]["users"][0]["status"] == "away"
+
+def test_rollback_does_not_bump(client, Session):
+    etag = client.get("/agents").headers["etag"]
+
+    db = Session()
+    db.add(Agent(name="Ghost", personality="", context=""))
+    db.flush()
+    db.rollback()
+    db.close()
+
+    assert http_cache.versions.get(("agents", "rooms")) == (0, 0)
+    assert revalidate(client, "/agents", etag) == 304
@@ -0,0 +1,179 @@
+# backend/test_llm_gateway.py
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import openai
+import pytest
+
+from llm_gateway import Backend, CircuitBreaker, GatewayError, LLMGateway
+
+class StubServer:
+    """Local OpenAI-compatible endpoint answering after `delay` with `status`."""
+
+    def __init__(self, delay: float = 0.0, status: int = 200, content: str = "ok"):
+        self.delay = delay
+        self.status = status
+        self.content = content
+        self.requests = 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers["content-length"]))
+                stub.requests += 1
+                time.sleep(stub.delay)
+                if stub.status == 200:
+                    body = {
+                        "id": "stub", "object": "chat.completion", "created": 0, "model": "stub",
+                        "choices": [{"index": 0, "finish_reason": "stop",
+                                     "message": {"role": "assistant", "content": stub.content}}],
+                    }
+                else:
+                    body = {"error": {"message": f"stub error {stub.status}"}}
+                data = json.dumps(body).encode()
+                try:
+                    self.send_response(stub.status)
+                    self.send_header("content-type", "application/json")
+                    self.send_header("content-length", str(len(data)))
+                    self.end_headers()
+                    self.wfile.write(data)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # Le client a annulé la requête
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_address[1]}/v1"
+
+    def backend(self, name: str) -> Backend:
+        return Backend(name, self.url, "stub-key", "stub-model", timeout=5.0)
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+@pytest.fixture
+def stubs():
+    servers = []
+
+    def make(**kwargs) -> StubServer:
+        server = StubServer(**kwargs)
+        servers.append(server)
+        return server
+
+    yield make
+    for server in servers:
+        server.close()
+
+MESSAGES = [{"role": "user", "content": "hi"}]
+
+def content(response) -> str:
+    return response.choices[0].message.content
+
+def test_hedge_wins_and_loser_gets_a_lower_bound(stubs):
+    slow = stubs(delay=1.0, content="slow").backend("slow")
+    fast = stubs(delay=0.05, content="fast").backend("fast")
+    gateway = LLMGateway([slow, fast], default_hedge_delay=0.1)
+
+    async def run():
+        start = time.perf_counter()
+        response = await gateway.chat(MESSAGES)
+        elapsed = time.perf_counter() - start
+        await asyncio.sleep(0.05)  # Laisser la tâche annulée se terminer
+        return response, elapsed
+
+    response, elapsed = asyncio.run(run())
+    assert content(response) == "fast"
+    assert elapsed < 0.8
+    assert len(fast.latencies) == 1
+    # Le perdant annulé ne fournit pas d'échantillon, seulement une borne inférieure
+    assert len(slow.latencies) == 0
+    assert slow.lower_bound >= 0.1
+    assert not slow.breaker.probing
+
+def test_hedge_loser_moves_behind_the_winner(stubs):
+    slow_stub = stubs(delay=1.0, content="slow")
+    fast_stub = stubs(delay=0.05, content="fast")
+    slow, fast = slow_stub.backend("slow"), fast_stub.backend("fast")
+    gateway = LLMGateway([slow, fast], default_hedge_delay=0.2)
+
+    async def run():
+        responses = [content(await gateway.chat(MESSAGES)) for _ in range(5)]
+        await asyncio.sleep(0.05)
+        return responses
+
+    start = time.perf_counter()
+    assert asyncio.run(run()) == ["fast"] * 5
+    # Seul le premier appel a attendu le délai de hedge et doublé la requête
+    assert slow_stub.requests == 1
+    assert fast_stub.requests == 5
+    assert time.perf_counter() - start < 1.0
+    assert gateway.ordered_backends()[0] is fast
+
+@pytest.mark.parametrize("status", [429, 500, 503])
+def test_fails_over_on_retryable_status(stubs, status):
+    failing = stubs(status=status).backend("failing")
+    healthy = stubs(content="healthy").backend("healthy")
+    gateway = LLMGateway([failing, healthy], default_hedge_delay=5.0)
+
+    response = asyncio.run(gateway.chat(MESSAGES))
+    assert content(response) == "healthy"
+    assert failing.breaker.failures == 1
+
+def test_client_error_is_not_retried(stubs):
+    bad_request = stubs(status=400)
+    healthy = stubs(content="healthy")
+    gateway = LLMGateway([bad_request.backend("bad"), healthy.backend("healthy")], default_hedge_delay=5.0)
+
+    with pytest.raises(openai.BadRequestError):
+        asyncio.run(gateway.chat(MESSAGES))
+    assert healthy.requests == 0
+
+def test_breaker_trips_and_skips_backend(stubs):
+    failing_server = stubs(status=500)
+    failing = failing_server.backend("failing")
+    healthy = stubs(content="healthy").backend("healthy")
+    gateway = LLMGateway([failing, healthy], default_hedge_delay=5.0)
+
+    async def run():
+        # Seul en lice : sinon le backend sain, mesuré, passerait devant dès le premier appel
+        alone = LLMGateway([failing])
+        for _ in range(failing.breaker.failure_threshold):
+            with pytest.raises(GatewayError):
+                await alone.chat(MESSAGES)
+        assert not failing.breaker.available()
+        return await gateway.chat(MESSAGES)
+
+    assert content(asyncio.run(run())) == "healthy"
+    assert failing_server.requests == failing.breaker.failure_threshold
+
+def test_all_backends_failing_raises(stubs):
+    gateway = LLMGateway([stubs(status=502).backend("a"), stubs(status=429).backend("b")])
+    with pytest.raises(GatewayError):
+        asyncio.run(gateway.chat(MESSAGES))
+
+def test_half_open_breaker_lets_one_probe_through():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.0)
+    breaker.record_failure()
+    assert breaker.allow()
+    assert not breaker.allow()
+    # Sonde échouée : le circuit se rouvre
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.allow() and breaker.allow()
+
+def test_cancelled_probe_is_released():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.0)
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.release()
+    assert breaker.allow()
@@ -0,0 +1,73 @@
+# backend/test_main.py
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.pool import StaticPool
+
+import database
+import main
+from resources import Resources
+
+class StubGateway:
+    backends = []
+
+    async def close(self):
+        pass
+
+class FakeWebSocket:
+    def __init__(self):
+        self.accepted = False
+        self.closed_with = None
+
+    async def accept(self):
+        self.accepted = True
+
+    async def close(self, code: int = 1000):
+        self.closed_with = code
+
+@pytest.fixture
+def app(monkeypatch):
+    # Base en mémoire et passerelle factice : le démarrage ne touche ni chat.db ni le réseau
+    monkeypatch.setattr(database, "engine", create_engine("sqlite://", poolclass=StaticPool))
+    resources = Resources(lambda gateway: object())
+    resources._gateway = StubGateway()
+    monkeypatch.setattr(main, "resources", resources)
+    monkeypatch.setattr(main, "manager", main.ConnectionManager())
+    return main.app
+
+def test_healthz_answers_before_warm_up(app):
+    client = TestClient(app)  # Sans bloc with : le lifespan ne s'exécute pas
+    assert client.get("/healthz").json() == {"status": "ok"}
+
+def test_readyz_is_503_until_warm_up(app):
+    assert TestClient(app).get("/readyz").status_code == 503
+    with TestClient(app) as client:
+        response = client.get("/readyz")
+        assert response.status_code == 200
+        assert response.json()["status"] == "ready"
+    assert not main.resources.ready
+
+def test_drain_closes_connections_with_going_away(app):
+    with TestClient(app) as client:
+        with client.websocket_connect("/ws/alice") as websocket:
+            client.portal.call(main.manager.drain)
+            message = websocket.receive()
+            assert message["type"] == "websocket.close"
+            assert message["code"] == 1001
+
+def test_connections_are_refused_while_draining():
+    manager = main.ConnectionManager()
+    connected = FakeWebSocket()
+
+    async def run():
+        await manager.connect(connected)
+        await manager.drain()
+        late = FakeWebSocket()
+        assert not await manager.connect(late)
+        return late
+
+    late = asyncio.run(run())
+    assert connected.closed_with == 1001
+    assert not late.accepted and late.closed_with == 1012
@@ -0,0 +1,115 @@
+# backend/test_room_commands.py
+import asyncio
+import json
+import time
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from agent_manager import AgentManager
+from database import Base
+from models import Room, RoomCommand
+from room_commands import CommandTable, RoomCommandRegistry, command_timeouts
+
+class FakeWebSocket:
+    def __init__(self):
+        self.sent = []
+
+    async def send_text(self, data: str):
+        self.sent.append(json.loads(data))
+
+class StubChatGPT:
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.calls = []
+
+    async def generate_response(self, question: str, command: str) -> str:
+        self.calls.append((command, question))
+        await asyncio.sleep(self.delay)
+        return f"{command}: {question}"
+
+@pytest.fixture
+def session_factory():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    db = Session()
+    db.add(Room(name="general"))
+    db.commit()
+    db.close()
+    return Session
+
+def disable(session_factory, command: str):
+    db = session_factory()
+    room = db.query(Room).filter(Room.name == "general").one()
+    db.add(RoomCommand(room_id=room.id, command=command, is_active=False))
+    db.commit()
+    db.close()
+
+def test_table_is_reloaded_after_commit(session_factory):
+    registry = RoomCommandRegistry(session_factory)
+    table = registry.get("general")
+    assert table.match("isum(x)") is not None
+    assert registry.get("general") is table
+
+    disable(session_factory, "sum")
+    reloaded = registry.get("general")
+    assert reloaded is not table
+    assert reloaded.match("isum(x)") is None
+    assert reloaded.match("isummarize(x)")[0] == "summarize"
+
+def test_registry_is_bounded(session_factory):
+    registry = RoomCommandRegistry(session_factory, max_rooms=2)
+    for room_name in ("a", "b", "a", "c"):
+        registry.get(room_name)
+    assert list(registry.tables) == ["a", "c"]
+
+def test_timeouts_are_read_lazily_and_validated(monkeypatch):
+    monkeypatch.setenv("COMMAND_TIMEOUT", "5")
+    monkeypatch.setenv("COMMAND_TIMEOUTS", '{"summarize": 60, "bad": "soon", "neg": -1}')
+    assert command_timeouts() == (5.0, {"summarize": 60.0})
+
+    monkeypatch.setenv("COMMAND_TIMEOUT", "nan")
+    monkeypatch.setenv("COMMAND_TIMEOUTS", "{not json")
+    assert command_timeouts() == (30.0, {})
+
+def test_table_resolves_timeouts():
+    table = CommandTable(frozenset({"sum"}), 10.0, {"summarize": 60.0})
+    assert table.match("isummarize(text)") == ("summarize", "text", 60.0)
+    assert table.match("iask(why)") == ("ask", "why", 10.0)
+    assert table.match("hello") is None
+
+def run_triggers(manager: AgentManager, message: str, settle: float = 0.0):
+    websocket = FakeWebSocket()
+    manager.active_connections["general"] = [websocket]
+
+    async def run():
+        start = time.perf_counter()
+        await manager.handle_triggers(message, "general", "alice")
+        elapsed = time.perf_counter() - start
+        await asyncio.sleep(settle)
+        return elapsed
+
+    return asyncio.run(run()), websocket.sent
+
+def test_disabled_command_is_ignored(session_factory):
+    disable(session_factory, "sum")
+    chatgpt = StubChatGPT()
+    manager = AgentManager(chatgpt, RoomCommandRegistry(session_factory))
+    _, sent = run_triggers(manager, "isum(1, 2)", settle=0.05)
+    assert chatgpt.calls == []
+    assert sent == []
+
+def test_timeout_is_broadcast(session_factory, monkeypatch):
+    monkeypatch.setenv("COMMAND_TIMEOUT", "0.05")
+    manager = AgentManager(StubChatGPT(delay=1.0), RoomCommandRegistry(session_factory))
+    _, sent = run_triggers(manager, "iask(why)", settle=0.2)
+    assert sent == [{"message": "Command iask timed out after 0.05s", "username": "AI_Ask"}]
+
+def test_slow_command_does_not_block_triggers(session_factory):
+    manager = AgentManager(StubChatGPT(delay=0.3), RoomCommandRegistry(session_factory))
+    elapsed, sent = run_triggers(manager, "iask(why)", settle=0.5)
+    assert elapsed < 0.1
+    assert sent == [{"message": "ask: why", "username": "AI_Ask"}]
@@ -0,0 +1,155 @@
+# backend/test_users.py
+import base64
+import io
+import struct
+import zlib
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from PIL import Image
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import blob_store
+from auth import create_access_token, get_db
+from blob_store import InvalidImage, avatar_value
+from database import Base
+from models import User
+from schemas import RoomResponse, UserResponse
+from users import router
+
+def png(width: int, height: int) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height), "red").save(buffer, format="PNG")
+    return buffer.getvalue()
+
+def png_claiming(width: int, height: int) -> bytes:
+    """A tiny PNG whose header announces width x height pixels."""
+    data = bytearray(png(1, 1))
+    # IHDR : longueur (4) + type (4) + largeur, hauteur ... puis CRC sur type + données
+    data[16:24] = struct.pack(">II", width, height)
+    data[29:33] = struct.pack(">I", zlib.crc32(bytes(data[12:29])))
+    return bytes(data)
+
+def data_uri(data: bytes) -> str:
+    return "data:image/png;base64," + base64.b64encode(data).decode()
+
+@pytest.fixture(autouse=True)
+def blob_root(tmp_path, monkeypatch):
+    monkeypatch.setenv("BLOB_ROOT", str(tmp_path / "blobs"))
+    monkeypatch.setenv("SECRET_KEY", "test-secret")
+    monkeypatch.setattr(blob_store, "_store", None)
+
+@pytest.fixture
+def client():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    TestingSession = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    db = TestingSession()
+    db.add_all([User(username="alice", hashed_password="x"), User(username="bob", hashed_password="x")])
+    db.commit()
+    db.close()
+
+    def override_get_db():
+        db = TestingSession()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app = FastAPI()
+    app.include_router(router)
+    app.dependency_overrides[get_db] = override_get_db
+    return TestClient(app)
+
+def auth(username: str) -> dict:
+    return {"Authorization": f"Bearer {create_access_token(username)}"}
+
+def test_store_is_built_from_env_on_first_use(tmp_path):
+    assert blob_store.get_store().root == str(tmp_path / "blobs")
+
+def test_data_uri_is_stored_and_replaced_by_digest():
+    digest = avatar_value(data_uri(png(300, 200)))
+    store = blob_store.get_store()
+    assert all(store.exists(digest, size) for size in blob_store.AVATAR_SIZES)
+    assert avatar_value(f"/avatars/{digest}") == digest
+    assert avatar_value(digest) == digest
+
+@pytest.mark.parametrize("value", ["x" * 5000, "https://example.com/a.png", "0" * 64, "/avatars/" + "0" * 64])
+def test_other_values_are_rejected(value):
+    with pytest.raises(InvalidImage):
+        avatar_value(value)
+
+def test_oversized_image_is_rejected_before_decoding():
+    # Quelques octets, 400 millions de pixels annoncés
+    with pytest.raises(InvalidImage):
+        blob_store.get_store().put_avatar(png_claiming(20000, 20000))
+    # Au-delà de la limite de Pillow : DecompressionBombError dès open()
+    with pytest.raises(InvalidImage):
+        blob_store.get_store().put_avatar(png_claiming(60000, 60000))
+
+def test_avatar_url_survives_revalidation():
+    digest = "a" * 64
+    user = UserResponse(id=1, username="alice", is_moderator=False, avatar=digest, status="online")
+    assert user.avatar == f"/avatars/{digest}"
+    assert UserResponse.model_validate(user.model_dump()).avatar == f"/avatars/{digest}"
+    room = RoomResponse(id=1, name="general", is_public=True, created_by=1, users=[user])
+    assert RoomResponse.model_validate(room.model_dump()).users[0].avatar == f"/avatars/{digest}"
+
+def test_write_routes_require_a_token(client):
+    assert client.put("/users/me", json={"status": "away"}).status_code == 401
+    assert client.put("/users/me?username=bob", json={"status": "away"}).status_code == 401
+    bad = {"Authorization": "Bearer not-a-token"}
+    assert client.put("/users/me/avatar", content=png(10, 10), headers=bad).status_code == 401
+
+def test_update_me_uses_token_identity(client):
+    response = client.put("/users/me", json={"status": "away"}, headers=auth("alice"))
+    assert response.status_code == 200
+    assert response.json()["username"] == "alice"
+
+def test_update_me_rejects_non_image_avatar(client):
+    response = client.put("/users/me", json={"avatar": "x" * 5000}, headers=auth("alice"))
+    assert response.status_code == 400
+
+def test_uploaded_avatar_is_served_with_etag(client):
+    response = client.put("/users/me/avatar", content=png(300, 200), headers=auth("alice"))
+    assert response.status_code == 200
+    url = response.json()["avatar"]
+    assert url.startswith("/avatars/")
+
+    avatar = client.get(url)
+    assert avatar.status_code == 200
+    assert "immutable" in avatar.headers["cache-control"]
+    assert Image.open(io.BytesIO(avatar.content)).size == (128, 85)
+    assert client.get(url, headers={"If-None-Match": avatar.headers["etag"]}).status_code == 304
+
+def test_read_me_uses_token_and_revalidates(client):
+    assert client.get("/users/me").status_code == 401
+
+    response = client.get("/users/me", headers=auth("bob"))
+    assert response.status_code == 200
+    assert response.json()["username"] == "bob"
+
+    headers = {**auth("bob"), "If-None-Match": response.headers["etag"]}
+    assert client.get("/users/me", headers=headers).status_code == 304
+
+    client.put("/users/me", json={"status": "away"}, headers=auth("bob"))
+    changed = client.get("/users/me", headers=headers)
+    assert changed.status_code == 200
+    assert changed.json()["status"] == "away"
+
+def test_oversized_upload_is_rejected_before_reading(client):
+    headers = {**auth("alice"), "Content-Length": str(blob_store.MAX_AVATAR_BYTES + 1)}
+    response = client.put("/users/me/avatar", content=b"x" * 10, headers=headers)
+    assert response.status_code == 413
+
+def test_streamed_upload_is_capped(client):
+    # Corps chunked, sans Content-Length : la lecture s'arrête à la limite
+    def chunks():
+        for _ in range(3):
+            yield b"x" * blob_store.MAX_AVATAR_BYTES
+
+    response = client.put("/users/me/avatar", content=chunks(), headers=auth("alice"))
+    assert response.status_code == 413
@@ -0,0 +1,83 @@
+# backend/users.py
+import asyncio
+import os
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.responses import FileResponse
+from sqlalchemy.orm import Session
+from auth import authenticate_user, create_access_token, get_db, get_token_user, get_token_username
+from blob_store import AVATAR_SIZES, DIGEST_RE, MAX_AVATAR_BYTES, InvalidImage, avatar_value, get_store
+from http_cache import cache, etag_matches
+from models import User
+from schemas import UserLogin, UserResponse, UserUpdate
+
+router = APIRouter()
+
+# Un chemin d'avatar ne change jamais de contenu : cache navigateur/CDN sans revalidation
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+@router.get("/users/me", response_model=UserResponse)
+def read_me(request: Request, username: str = Depends(get_token_username), db: Session = Depends(get_db)):
+    # Le jeton suffit à identifier l'utilisateur : une entrée en cache évite toute requête SQL
+    def build() -> bytes:
+        user = db.query(User).filter(User.username == username).first()
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
+        return UserResponse.model_validate(user).model_dump_json().encode()
+
+    return cache.respond(request, ("users/me", username), ("users",), build)
+
+@router.post("/token")
+def issue_token(credentials: UserLogin, db: Session = Depends(get_db)):
+    user = authenticate_user(db, credentials.username, credentials.password)
+    if not user:
+        raise HTTPException(status_code=401, detail="Invalid username or password")
+    return {"access_token": create_access_token(user.username), "token_type": "bearer"}
+
+@router.put("/users/me", response_model=UserResponse)
+def update_me(update: UserUpdate, user: User = Depends(get_token_user), db: Session = Depends(get_db)):
+    if update.avatar is not None:
+        try:
+            user.avatar = avatar_value(update.avatar)
+        except InvalidImage as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    if update.status is not None:
+        user.status = update.status
+    db.commit()
+    db.refresh(user)
+    return user
+
+@router.put("/users/me/avatar", response_model=UserResponse)
+async def upload_avatar(request: Request, user: User = Depends(get_token_user), db: Session = Depends(get_db)):
+    too_large = HTTPException(status_code=413, detail=f"Avatar larger than {MAX_AVATAR_BYTES} bytes")
+    length = request.headers.get("content-length")
+    if length and length.isdigit() and int(length) > MAX_AVATAR_BYTES:
+        raise too_large
+    # Lecture plafonnée : un corps sans Content-Length (chunked) ne peut pas dépasser la limite en mémoire
+    data = bytearray()
+    async for chunk in request.stream():
+        data.extend(chunk)
+        if len(data) > MAX_AVATAR_BYTES:
+            raise too_large
+    try:
+        user.avatar = await asyncio.to_thread(get_store().put_avatar, bytes(data))
+    except InvalidImage as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    db.commit()
+    db.refresh(user)
+    return user
+
+@router.get("/avatars/{digest}")
+def get_avatar(digest: str, request: Request, size: int = 128):
+    if not DIGEST_RE.match(digest) or size not in AVATAR_SIZES:
+        raise HTTPException(status_code=404, detail="Avatar not found")
+
+    etag = f'"{digest}-{size}"'
+    headers = {"ETag": etag, "Cache-Control": IMMUTABLE}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    path = get_store().path(digest, size)
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="Avatar not found")
+    # FileResponse laisse le serveur envoyer le fichier directement (sendfile / pathsend)
+    return FileResponse(path, media_type="image/png", headers=headers)
@@ -2,16 +2,35 @@
 
 import React, { useState } from 'react';
 import { useNavigate } from 'react-router-dom';
+import axios from 'axios';
 import { TextField, Button, Container, Typography } from '@mui/material';
 
 const Login: React.FC = () => {
   const [username, setUsername] = useState<string>('');
+  const [password, setPassword] = useState<string>('');
+  const [error, setError] = useState<string>('');
   const navigate = useNavigate();
 
   const handleLogin = () => {
-    if (username.trim()) {
+    if (!username.trim()) {
+      return;
+    }
+    localStorage.setItem('username', username);
+    if (!password) {
+      // Sans mot de passe : accès invité au chat, sans jeton (profil non modifiable)
+      localStorage.removeItem('token');
       navigate(`/chat/${username}`);
+      return;
     }
+    axios
+      .post('http://localhost:8000/token', { username, password })
+      .then((response) => {
+        localStorage.setItem('token', response.data.access_token);
+        navigate(`/chat/${username}`);
+      })
+      .catch(() => {
+        setError("Nom d'utilisateur ou mot de passe invalide");
+      });
   };
 
   return (
@@ -26,6 +45,19 @@ const Login: React.FC = () => {
         onChange={(e) => setUsername(e.target.value)}
         margin="normal"
       />
+      <TextField
+        label="Mot de passe"
+        type="password"
+        fullWidth
+        value={password}
+        onChange={(e) => setPassword(e.target.value)}
+        margin="normal"
+      />
+      {error && (
+        <Typography color="error">
+          {error}
+        </Typography>
+      )}
       <Button
         variant="contained"
         color="primary"
@@ -11,6 +11,9 @@ const UserProfile: React.FC = () => {
   const token = localStorage.getItem('token');
 
   useEffect(() => {
+    if (!token) {
+      return;
+    }
     axios
       .get('http://localhost:8000/users/me', {
         headers: { Authorization: `Bearer ${token}` },
@@ -26,6 +29,17 @@ const UserProfile: React.FC = () => {
       });
   }, [token]);
 
+  // L'image est envoyée en data URI ; le serveur la stocke et renvoie son URL
+  const handleAvatarChange = (e: React.ChangeEvent<HTMLInputElement>) => {
+    const file = e.target.files?.[0];
+    if (!file) {
+      return;
+    }
+    const reader = new FileReader();
+    reader.onload = () => setAvatar(reader.result as string);
+    reader.readAsDataURL(file);
+  };
+
   const handleSave = () => {
     axios
       .put(
@@ -36,6 +50,7 @@ const UserProfile: React.FC = () => {
         }
       )
       .then((response) => {
+        setAvatar(response.data.avatar || '');
         alert('Profil enregistré avec succès');
       })
       .catch((error) => {
@@ -43,10 +58,19 @@ const UserProfile: React.FC = () => {
       });
   };
 
+  if (!token) {
+    return (
+      <div style={{ padding: '20px' }}>
+        <h2>Profil Utilisateur</h2>
+        <p>Connectez-vous avec votre mot de passe pour modifier votre profil.</p>
+      </div>
+    );
+  }
+
   return (
     <div style={{ padding: '20px' }}>
       <h2>Profil Utilisateur</h2>
-      <Avatar src={avatar} style={{ width: '100px', height: '100px' }} />
+      <Avatar src={avatar.startsWith('/') ? `http://localhost:8000${avatar}` : avatar} style={{ width: '100px', height: '100px' }} />
       <br />
       <TextField
         label="Nom d'utilisateur"
@@ -62,12 +86,10 @@ const UserProfile: React.FC = () => {
         style={{ marginBottom: '10px' }}
       />
       <br />
-      <TextField
-        label="URL de l'Avatar"
-        value={avatar}
-        onChange={(e) => setAvatar(e.target.value)}
-        style={{ marginBottom: '10px' }}
-      />
+      <Button variant="outlined" component="label" style={{ marginBottom: '10px' }}>
+        Choisir un avatar
+        <input type="file" accept="image/*" hidden onChange={handleAvatarChange} />
+      </Button>
       <br />
       <Button variant="contained" color="primary" onClick={handleSave}>
         Enregistrer